@@ -1,6 +1,12 @@
+import os
+import hashlib
+import tempfile
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import plotly.graph_objects as go
 from datetime import datetime
 
@@ -14,6 +20,9 @@ st.set_page_config(
 # --- NOME DO ARQUIVO DEFINIDO DIRETAMENTE NO CÓDIGO ---
 NOME_ARQUIVO_NPS = "NPS Dados 2025.1.xlsx"
 
+# Máximo de itens sobrepostos no radar (cada item é uma trace SVG)
+LIMITE_ITENS_RADAR = 8
+
 # -------------------- FUNÇÕES DE CÁLCULO --------------------
 def classificar_nps(nota):
     if nota <= 6:
@@ -23,32 +32,229 @@ def classificar_nps(nota):
     else:
         return 'Promotor'
 
-def calcular_score_nps(df):
-    total_respostas = len(df)
+CATEGORIAS_NPS = ['Detrator', 'Passivo', 'Promotor']
+
+def classificar_nps_serie(notas):
+    # Versão vetorizada de classificar_nps: mesmos limites (<=6, <=8) aplicados de uma vez
+    codigos = np.digitize(notas.to_numpy(), [6, 8], right=True)
+    return pd.Categorical.from_codes(codigos, categories=CATEGORIAS_NPS)
+
+def contar_classificacoes(df):
+    # Conta direto sobre os códigos inteiros da coluna categórica (0=Detrator, 1=Passivo, 2=Promotor)
+    contagens = np.bincount(df['classificacao'].cat.codes.to_numpy(), minlength=len(CATEGORIAS_NPS))
+    return pd.Series(contagens, index=CATEGORIAS_NPS)
+
+def calcular_score_nps(contagens):
+    # Recebe a contagem de respostas por classificação (Detrator, Passivo, Promotor)
+    total_respostas = contagens.sum()
     if total_respostas == 0:
         return 0
-    promotores = df[df['classificacao'] == 'Promotor'].shape[0]
-    detratores = df[df['classificacao'] == 'Detrator'].shape[0]
-    percent_promotores = (promotores / total_respostas) * 100
-    percent_detratores = (detratores / total_respostas) * 100
-    return round(percent_promotores - percent_detratores)
+    promotores = contagens.get('Promotor', 0)
+    detratores = contagens.get('Detrator', 0)
+    # %promotores - %detratores com uma única divisão
+    return round((promotores - detratores) * 100 / total_respostas)
+
+def calcular_score_nps_por_grupo(df, chaves):
+    # Mesmo score de calcular_score_nps, para cada grupo de chaves: cada chave é fatorada uma vez,
+    # as chaves são combinadas num único código de grupo e as contagens saem de np.bincount
+    codigos_grupo = np.zeros(len(df), dtype=np.int64)
+    validos = np.ones(len(df), dtype=bool)
+    valores_chaves = []
+    for chave in chaves:
+        codigos, valores = pd.factorize(df[chave], sort=True)
+        codigos_grupo = codigos_grupo * len(valores) + codigos
+        validos &= codigos >= 0
+        valores_chaves.append(valores)
+    codigos_classificacao = df['classificacao'].cat.codes.to_numpy()
+    if not validos.all():
+        codigos_grupo = codigos_grupo[validos]
+        codigos_classificacao = codigos_classificacao[validos]
+    # Um contador por combinação possível de chaves; só as combinações com respostas seguem adiante
+    total_grupos = int(np.prod([len(valores) for valores in valores_chaves]))
+    total_respostas = np.bincount(codigos_grupo, minlength=total_grupos)
+    # Os pesos (+1 promotor, -1 detrator, 0 passivo) dão promotores - detratores num único bincount
+    saldo = np.bincount(codigos_grupo, weights=np.sign(codigos_classificacao - 1), minlength=total_grupos)
+    grupos = np.flatnonzero(total_respostas)
+    # Decodifica o código combinado de volta nos valores de cada chave (da última para a primeira)
+    colunas = {}
+    restante = grupos
+    for chave, valores in reversed(list(zip(chaves, valores_chaves))):
+        restante, posicoes = np.divmod(restante, len(valores))
+        colunas[chave] = valores[posicoes]
+    resultado = pd.DataFrame({chave: colunas[chave] for chave in chaves})
+    resultado['valor'] = np.round(saldo[grupos] * 100 / total_respostas[grupos]).astype(int)
+    return resultado
 
 # -------------------- CARREGAMENTO DOS DADOS --------------------
-@st.cache_data
-def carregar_dados(nome_arquivo):
+COLUNAS_CATEGORICAS = ['Plano do Cliente', 'Setor', 'Canal', 'Empresa']
+# Além destas, seguem para o painel todas as colunas numéricas (notas dos critérios)
+COLUNAS_USADAS = ['data', 'mes_ano', 'nota_nps', 'classificacao', 'Justificativa'] + COLUNAS_CATEGORICAS
+
+def ler_arquivo(nome_arquivo):
     if nome_arquivo.endswith('.csv'):
         return pd.read_csv(nome_arquivo, encoding='latin-1', sep=';')
     else:
         return pd.read_excel(nome_arquivo)
 
+# Chave gravada nos metadados do Parquet com o hash do arquivo de origem
+CHAVE_ORIGEM_PARQUET = b'origem_sha256'
+
+def hash_arquivo(nome_arquivo):
+    with open(nome_arquivo, 'rb') as arquivo:
+        return hashlib.sha256(arquivo.read()).hexdigest().encode()
+
+@st.cache_data
+def carregar_dados(nome_arquivo):
+    # Ler o Excel é a parte mais lenta da carga: usa a cópia em Parquet quando ela foi gerada a partir
+    # deste mesmo conteúdo (hash nos metadados; mtime não é confiável após clone/deploy)
+    arquivo_parquet = os.path.splitext(nome_arquivo)[0] + '.parquet'
+    hash_origem = hash_arquivo(nome_arquivo) if os.path.exists(nome_arquivo) else None
+    df = None
+    if os.path.exists(arquivo_parquet):
+        try:
+            metadados = pq.read_schema(arquivo_parquet).metadata or {}
+            if hash_origem is None or metadados.get(CHAVE_ORIGEM_PARQUET) == hash_origem:
+                df = pd.read_parquet(arquivo_parquet, engine='pyarrow')
+        except (OSError, pa.ArrowException):
+            df = None  # Cópia ilegível (ex.: gravação interrompida): volta para o arquivo original e regenera a cópia
+    parquet_atualizado = df is not None
+    if not parquet_atualizado:
+        df = ler_arquivo(nome_arquivo)
+    # Colunas de poucos valores distintos viram 'category': filtros e agrupamentos passam a comparar códigos inteiros
+    for col in COLUNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    # O texto que sobra como object (ID, País, Justificativa) vira string Arrow: um buffer contíguo em vez de um objeto Python por célula
+    for col in df.select_dtypes(include=['object', 'string']).columns:
+        df[col] = df[col].astype('string[pyarrow]')
+    if not parquet_atualizado:
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        tabela = tabela.replace_schema_metadata({**tabela.schema.metadata, CHAVE_ORIGEM_PARQUET: hash_origem})
+        arquivo_temporario = None
+        try:
+            # Grava num temporário da mesma pasta e só então troca pelo definitivo (os.replace é atômico):
+            # um processo interrompido no meio da gravação nunca deixa um Parquet pela metade no lugar da cópia
+            descritor, arquivo_temporario = tempfile.mkstemp(
+                prefix=os.path.basename(arquivo_parquet) + '.', suffix='.tmp',
+                dir=os.path.dirname(os.path.abspath(arquivo_parquet))
+            )
+            os.close(descritor)
+            pq.write_table(tabela, arquivo_temporario)
+            os.replace(arquivo_temporario, arquivo_parquet)
+        except (OSError, pa.ArrowException):
+            # Sem permissão de escrita: segue lendo o arquivo original
+            if arquivo_temporario and os.path.exists(arquivo_temporario):
+                os.remove(arquivo_temporario)
+    df.rename(columns={'NPS Quantitativo': 'nota_nps', 'Data': 'data'}, inplace=True)
+    df['data'] = pd.to_datetime(df['data'])
+    # Notas de 0 a 10 cabem em int8 (ou float32, se houver fração): 1/8 dos bytes em máscaras, groupby e médias
+    for col in df.select_dtypes(include='number').columns:
+        if df[col].dropna().between(0, 10).all():
+            df[col] = pd.to_numeric(df[col], downcast='integer' if pd.api.types.is_integer_dtype(df[col]) else 'float')
+    df['mes_ano'] = df['data'].dt.to_period('M').astype(str).astype('category')
+    df['classificacao'] = classificar_nps_serie(df['nota_nps'])
+    # Ordenada por data, a base permite filtrar o período por busca binária (ver aplicar_filtros)
+    df = df.sort_values('data', kind='stable')
+    # Colunas que o painel não usa (ex.: ID, País) saem aqui e não pesam nos filtros e cópias seguintes
+    return df[[col for col in df.columns if col in COLUNAS_USADAS or pd.api.types.is_numeric_dtype(df[col])]]
+
+# -------------------- FILTROS --------------------
+@st.cache_data(max_entries=32)
+def aplicar_filtros(_df, data_inicio, data_fim, termo_pesquisa, selecoes):
+    # Cacheado pela combinação de filtros: repetir uma seleção já vista não refaz as máscaras.
+    # _df é sempre df_original: o '_' evita que o Streamlit calcule o hash da base inteira a cada chamada
+    # 'data' vem ordenada de carregar_dados: o período vira duas buscas binárias e um fatiamento, sem máscaras
+    datas = _df['data'].to_numpy()
+    inicio = datas.searchsorted(data_inicio.to_datetime64(), side='left')
+    fim = datas.searchsorted(data_fim.to_datetime64(), side='right')
+    df = _df.iloc[inicio:fim]
+    if termo_pesquisa:
+        # Filtra o dataframe com base no texto digitado, ignorando maiúsculas/minúsculas.
+        # A busca (substring literal, sem regex) roda só sobre os nomes distintos da coluna categórica
+        empresas = df['Empresa'].cat.categories
+        encontradas = pc.match_substring(pa.array(empresas.astype(str)), termo_pesquisa, ignore_case=True)
+        df = df[df['Empresa'].isin(empresas[encontradas.to_numpy(zero_copy_only=False)])]
+    for filtro, opcoes_selecionadas in selecoes:
+        df = df[df[filtro].isin(opcoes_selecionadas)]
+    return df, contar_classificacoes(df)
+
+@st.cache_data
+def valores_unicos(_df, coluna):
+    # Chave só pelo nome da coluna: _df é sempre df_original, e o '_' evita o hash da base inteira a cada rerun.
+    # As colunas de filtro são categóricas, então as opções são as próprias categorias
+    return sorted(_df[coluna].cat.categories.tolist())
+
+# -------------------- FUNÇÕES DE GRÁFICOS --------------------
+# As figuras ficam em cache pela especificação + dados agregados: reruns causados por outros widgets reaproveitam o objeto
+# (até 16 por tipo de gráfico; o cache é compartilhado entre sessões, então as entradas mais antigas são descartadas).
+# O uirevision de cada figura vem da especificação: zoom e legenda sobrevivem aos reruns, mas não à troca de gráfico
+@st.cache_resource(max_entries=16)
+def gerar_grafico_barras(df_grafico, eixo_x, eixo_y, cor):
+    # Os dados já chegam agregados: uma trace por valor de 'cor', montada direto dos arrays (sem plotly.express)
+    figura = go.Figure()
+    grupos_cor = df_grafico.groupby(cor, observed=True, sort=False) if cor else [(None, df_grafico)]
+    for valor_cor, df_cor in grupos_cor:
+        valores = df_cor['valor'].to_numpy()
+        figura.add_trace(go.Bar(
+            x=df_cor[eixo_x].to_numpy(), y=valores, text=valores, texttemplate='%{text:.2s}',
+            name=str(valor_cor) if cor else None
+        ))
+    figura.update_layout(
+        title=f'{eixo_y} por {eixo_x}' + (f' agrupado por {cor}' if cor else ''),
+        xaxis_title=eixo_x, yaxis_title='valor', legend_title_text=cor, barmode='relative',
+        uirevision=f'{eixo_x}|{eixo_y}|{cor}'
+    )
+    return figura
+
+@st.cache_resource(max_entries=16)
+def gerar_grafico_pizza(df_grafico, eixo_x):
+    figura = go.Figure(go.Pie(labels=df_grafico[eixo_x].to_numpy(), values=df_grafico['valor'].to_numpy(), hole=0.4))
+    figura.update_layout(title=f'Contagem de Respostas por {eixo_x}', uirevision=eixo_x)
+    return figura
+
+@st.cache_resource(max_entries=16)
+def gerar_grafico_radar(df_media_radar, categoria_radar, itens_selecionados_radar):
+    fig_radar = go.Figure()
+    colunas_de_notas = list(df_media_radar.columns)
+    for item in itens_selecionados_radar:
+        if item in df_media_radar.index:
+            valores = df_media_radar.loc[item].to_numpy().tolist()
+            textos_rotulos = [f'{v:.1f}' for v in valores]
+            valores.append(valores[0])
+            textos_rotulos.append(textos_rotulos[0])
+            categorias_theta = colunas_de_notas + [colunas_de_notas[0]]
+
+            fig_radar.add_trace(go.Scatterpolar(
+                r=valores, theta=categorias_theta, fill='toself', name=str(item),
+                mode='lines+markers+text', text=textos_rotulos, textposition='top center',
+                textfont=dict(size=12),
+                hovertemplate=f"<b>{item}</b><br>Critério: %{{theta}}<br>Nota Média: %{{r:.2f}}<extra></extra>"
+            ))
+
+    fig_radar.update_layout(
+        template='plotly_dark', polar=dict(radialaxis=dict(visible=True, range=[0, 10])),
+        showlegend=True, title=f"Comparativo de Notas Médias por '{categoria_radar}'", uirevision=categoria_radar
+    )
+    return fig_radar
+
+@st.cache_resource(max_entries=16)
+def gerar_grafico_tendencia(df_grafico_linha, metrica_linha):
+    valores_linha = df_grafico_linha['valor'].to_numpy()
+    # Scattergl desenha a linha via WebGL em vez de um nó SVG por ponto
+    fig_linha_dinamico = go.Figure(go.Scattergl(
+        x=df_grafico_linha['mes_ano'].to_numpy(), y=valores_linha, mode='lines+markers+text',
+        text=valores_linha, textposition='top center'
+    ))
+    fig_linha_dinamico.update_layout(
+        title=f'Tendência Mensal de {metrica_linha}', xaxis_title='mes_ano', yaxis_title='valor', uirevision=metrica_linha
+    )
+    return fig_linha_dinamico
+
 # -------------------- INTERFACE PRINCIPAL --------------------
 st.sidebar.image("icons8-marketing-100.png", width=100)
 
 try:
     df_original = carregar_dados(NOME_ARQUIVO_NPS)
-    df_original.rename(columns={'NPS Quantitativo': 'nota_nps', 'Data': 'data'}, inplace=True)
-    df_original['data'] = pd.to_datetime(df_original['data'])
-    df_original['classificacao'] = df_original['nota_nps'].apply(classificar_nps)
 except FileNotFoundError:
     st.error(f"Erro: Arquivo '{NOME_ARQUIVO_NPS}' não encontrado.")
     st.info("Por favor, certifique-se de que o arquivo de dados e o script Python estão na mesma pasta.")
@@ -63,27 +269,34 @@ data_inicio = st.sidebar.date_input('De:', df_original['data'].min().date())
 data_fim = st.sidebar.date_input('Até:', df_original['data'].max().date())
 data_inicio_dt = pd.to_datetime(data_inicio)
 data_fim_dt = pd.to_datetime(data_fim)
-df_filtrado = df_original[(df_original['data'] >= data_inicio_dt) & (df_original['data'] <= data_fim_dt)]
 
 # --- NOVO: Caixa de Pesquisa por Empresa ---
-if 'Empresa' in df_filtrado.columns:
+termo_pesquisa = ''
+if 'Empresa' in df_original.columns:
     termo_pesquisa = st.sidebar.text_input("Pesquisar Empresa por Nome:")
-    if termo_pesquisa:
-        # Filtra o dataframe com base no texto digitado, ignorando maiúsculas/minúsculas
-        df_filtrado = df_filtrado[df_filtrado['Empresa'].str.contains(termo_pesquisa, case=False, na=False)]
 
 # --- Filtros Categóricos em lista ---
 filtros_disponiveis = ['Plano do Cliente', 'Setor', 'Canal'] # Removido 'Empresa' daqui pois já tem a busca
+# Por padrão as opções vêm da base completa (calculadas uma vez); em cascata seguem a busca e os filtros anteriores
+opcoes_em_cascata = st.sidebar.checkbox("Restringir opções aos filtros anteriores", value=False)
+selecoes = []
 for filtro in filtros_disponiveis:
-    if filtro in df_filtrado.columns:
-        # As opções agora são baseadas no dataframe já pré-filtrado pela busca
-        opcoes = df_filtrado[filtro].unique()
+    if filtro in df_original.columns:
+        if opcoes_em_cascata:
+            df_parcial, _ = aplicar_filtros(df_original, data_inicio_dt, data_fim_dt, termo_pesquisa, tuple(selecoes))
+            opcoes = sorted(df_parcial[filtro].dropna().unique().tolist())
+        else:
+            opcoes = valores_unicos(df_original, filtro)
         opcoes_selecionadas = st.sidebar.multiselect(
             f'Filtrar por {filtro}',
             options=opcoes,
             default=opcoes
         )
-        df_filtrado = df_filtrado[df_filtrado[filtro].isin(opcoes_selecionadas)]
+        # Com todas as opções marcadas o filtro não remove nada: não entra na lista (nem na chave do cache)
+        if len(opcoes_selecionadas) != len(opcoes):
+            selecoes.append((filtro, tuple(opcoes_selecionadas)))
+
+df_filtrado, contagem_classificacao = aplicar_filtros(df_original, data_inicio_dt, data_fim_dt, termo_pesquisa, tuple(selecoes))
 
 # -------------------- PAINEL PRINCIPAL (DASHBOARD) --------------------
 st.title("Análise de NPS e Critérios")
@@ -95,11 +308,11 @@ if df_filtrado.empty:
 
 # ----- KPIs -----
 # (O código dos KPIs e do resto do dashboard continua o mesmo)
-score_nps_final = calcular_score_nps(df_filtrado)
 total_respostas = len(df_filtrado)
-total_promotores = df_filtrado[df_filtrado['classificacao'] == 'Promotor'].shape[0]
-total_passivos = df_filtrado[df_filtrado['classificacao'] == 'Passivo'].shape[0]
-total_detratores = df_filtrado[df_filtrado['classificacao'] == 'Detrator'].shape[0]
+total_promotores = contagem_classificacao.get('Promotor', 0)
+total_passivos = contagem_classificacao.get('Passivo', 0)
+total_detratores = contagem_classificacao.get('Detrator', 0)
+score_nps_final = calcular_score_nps(contagem_classificacao)
 
 st.header("Visão Geral do NPS", divider='blue')
 col1, col2, col3 = st.columns(3)
@@ -134,16 +347,15 @@ with col_sel4:
 if eixo_x and eixo_y:
     if tipo_grafico == 'Barras':
         if eixo_y == 'Score NPS':
-            df_grafico = df_filtrado.groupby([eixo_x] + ([cor] if cor else [])).apply(calcular_score_nps).reset_index(name='valor')
+            df_grafico = calcular_score_nps_por_grupo(df_filtrado, [eixo_x] + ([cor] if cor else []))
         else:
-            df_grafico = df_filtrado.groupby([eixo_x] + ([cor] if cor else [])).size().reset_index(name='valor')
-        figura = px.bar(df_grafico, x=eixo_x, y='valor', color=cor, text='valor', title=f'{eixo_y} por {eixo_x}' + (f' agrupado por {cor}' if cor else ''))
-        figura.update_traces(texttemplate='%{text:.2s}')
+            df_grafico = df_filtrado.groupby([eixo_x] + ([cor] if cor else []), observed=True).size().reset_index(name='valor')
+        figura = gerar_grafico_barras(df_grafico, eixo_x, eixo_y, cor)
     elif tipo_grafico == 'Pizza (Rosca)':
         if eixo_y != 'Contagem de Respostas':
             st.warning(f"Gráficos de Pizza mostram melhor a 'Contagem de Respostas'. A métrica foi alterada automaticamente.")
-        df_grafico = df_filtrado.groupby(eixo_x).size().reset_index(name='valor')
-        figura = px.pie(df_grafico, names=eixo_x, values='valor', hole=0.4, title=f'Contagem de Respostas por {eixo_x}')
+        df_grafico = df_filtrado.groupby(eixo_x, observed=True).size().reset_index(name='valor')
+        figura = gerar_grafico_pizza(df_grafico, eixo_x)
     st.plotly_chart(figura, use_container_width=True)
 
 
@@ -151,7 +363,7 @@ if eixo_x and eixo_y:
 st.markdown("---")
 st.header("Análise Comparativa de Critérios (Gráfico de Radar)", divider='green')
 
-colunas_de_notas = [col for col in df_filtrado.columns if df_filtrado[col].dtype in ['int64', 'float64'] and col not in ['nota_nps']]
+colunas_de_notas = [col for col in df_filtrado.columns if pd.api.types.is_numeric_dtype(df_filtrado[col]) and col not in ['nota_nps']]
 colunas_de_agrupamento = [col for col in ['Empresa', 'Setor', 'Plano do Cliente', 'Canal'] if col in df_filtrado.columns]
 
 if not colunas_de_notas or not colunas_de_agrupamento:
@@ -162,56 +374,42 @@ else:
         categoria_radar = st.selectbox("Selecione a categoria para comparar:", options=colunas_de_agrupamento)
     with col_radar2:
         # As opções de itens agora são baseadas no dataframe já filtrado (inclusive pela busca)
+        opcoes_radar = df_filtrado[categoria_radar].unique()
         itens_selecionados_radar = st.multiselect(
             f"Selecione os itens de '{categoria_radar}' para plotar:",
-            options=df_filtrado[categoria_radar].unique()
+            options=opcoes_radar,
+            max_selections=LIMITE_ITENS_RADAR,
+            help=f"Até {LIMITE_ITENS_RADAR} itens por gráfico."
         )
     if not itens_selecionados_radar:
         st.info(f"Selecione um ou mais itens em '{categoria_radar}' para gerar o gráfico.")
     else:
-        fig_radar = go.Figure()
-        df_radar_filtrado = df_filtrado[df_filtrado[categoria_radar].isin(itens_selecionados_radar)]
-        df_media_radar = df_radar_filtrado.groupby(categoria_radar)[colunas_de_notas].mean().reset_index()
-
-        for item in itens_selecionados_radar:
-            dados_item = df_media_radar[df_media_radar[categoria_radar] == item]
-            if not dados_item.empty:
-                valores = dados_item[colunas_de_notas].values.flatten().tolist()
-                textos_rotulos = [f'{v:.1f}' for v in valores]
-                valores.append(valores[0])
-                textos_rotulos.append(textos_rotulos[0])
-                categorias_theta = colunas_de_notas + [colunas_de_notas[0]]
-                
-                fig_radar.add_trace(go.Scatterpolar(
-                    r=valores, theta=categorias_theta, fill='toself', name=str(item),
-                    mode='lines+markers+text', text=textos_rotulos, textposition='top center',
-                    textfont=dict(size=12),
-                    hovertemplate=f"<b>{item}</b><br>Critério: %{{theta}}<br>Nota Média: %{{r:.2f}}<extra></extra>"
-                ))
-                
-        fig_radar.update_layout(
-            template='plotly_dark', polar=dict(radialaxis=dict(visible=True, range=[0, 10])),
-            showlegend=True, title=f"Comparativo de Notas Médias por '{categoria_radar}'"
-        )
+        if len(itens_selecionados_radar) == len(opcoes_radar):
+            df_radar_filtrado = df_filtrado
+        else:
+            df_radar_filtrado = df_filtrado[df_filtrado[categoria_radar].isin(itens_selecionados_radar)]
+        # Médias indexadas pela categoria: cada item é buscado com .loc em vez de varrer o DataFrame agregado
+        df_media_radar = df_radar_filtrado.groupby(categoria_radar, observed=True)[colunas_de_notas].mean()
+        fig_radar = gerar_grafico_radar(df_media_radar, categoria_radar, tuple(itens_selecionados_radar))
         st.plotly_chart(fig_radar, use_container_width=True)
 
 # -------------------- GRÁFICO DE TENDÊNCIA --------------------
 st.markdown("---")
-# (O restante do código de tendência e feedbacks continua igual)
 st.header("Análise de Tendências", divider='blue')
-df_filtrado['mes_ano'] = df_filtrado['data'].dt.to_period('M').astype(str)
 metrica_linha = st.selectbox("Escolha a métrica para ver a tendência:", options=metricas_disponiveis)
 if metrica_linha == 'Score NPS':
-    df_grafico_linha = df_filtrado.groupby('mes_ano').apply(calcular_score_nps).reset_index(name='valor')
+    df_grafico_linha = calcular_score_nps_por_grupo(df_filtrado, ['mes_ano'])
 else:
-    df_grafico_linha = df_filtrado.groupby('mes_ano').size().reset_index(name='valor')
-fig_linha_dinamico = px.line(df_grafico_linha, x='mes_ano', y='valor', markers=True, text='valor', title=f'Tendência Mensal de {metrica_linha}')
-fig_linha_dinamico.update_traces(textposition="top center")
+    df_grafico_linha = df_filtrado.groupby('mes_ano', observed=True).size().reset_index(name='valor')
+fig_linha_dinamico = gerar_grafico_tendencia(df_grafico_linha, metrica_linha)
 st.plotly_chart(fig_linha_dinamico, use_container_width=True)
 
 st.markdown("---")
 if 'Justificativa' in df_filtrado.columns:
     st.header("Análise de Feedbacks", divider='blue')
-    df_detratores = df_filtrado[df_filtrado['classificacao'] == 'Detrator'][['nota_nps', 'Justificativa']].dropna()
+    # Só as 10 últimas posições (a base está em ordem de data) são materializadas, não todos os detratores
+    detratores_com_justificativa = (df_filtrado['classificacao'] == 'Detrator').to_numpy() & df_filtrado['Justificativa'].notna().to_numpy()
+    posicoes_recentes = np.flatnonzero(detratores_com_justificativa)[-10:]
+    df_detratores = df_filtrado.iloc[posicoes_recentes][['nota_nps', 'Justificativa']]
     st.subheader("Feedbacks Recentes de Detratores")
-    st.dataframe(df_detratores.tail(10), use_container_width=True)
\ No newline at end of file
+    st.dataframe(df_detratores, use_container_width=True)
\ No newline at end of file